@@ -1,32 +1,91 @@
 #!/usr/bin/env python3
 """Compare frames pixel-by-pixel between our render and official render."""
 
+import os
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from PIL import Image
 import numpy as np
 
-
-def compare_frames(ours_path, official_path, frame_num):
-    """Compare two frames and return pixel difference percentage."""
+try:
+    import cv2
+except ImportError:  # OpenCV is optional, fall back to PIL
+    cv2 = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None  # diff_stats takes the numpy path instead.
+
+
+if njit is not None:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _diff_rows(a, b, thresh, sums, peaks, counts):
+        """Fill per-row sum, max and above-threshold count of |a - b|."""
+        height, width, channels = a.shape
+        for y in prange(height):
+            total = 0
+            peak = 0
+            over = 0
+            for x in range(width):
+                for c in range(channels):
+                    d = abs(np.int64(a[y, x, c]) - np.int64(b[y, x, c]))
+                    total += d
+                    peak = max(peak, d)
+                    if d > thresh:
+                        over += 1
+            sums[y] = total
+            peaks[y] = peak
+            counts[y] = over
+
+
+def diff_stats(a, b, thresh=10):
+    """Return mean, max and count above thresh of the per-channel |a - b|."""
+    if njit is None:
+        diff = np.maximum(a, b)
+        diff -= np.minimum(a, b)
+        return diff.mean(), diff.max(), np.count_nonzero(diff > thresh)
+
+    # Rows are reduced in parallel into these, then folded here
+    rows = a.shape[0]
+    sums = np.empty(rows, np.int64)
+    peaks = np.empty(rows, np.int64)
+    counts = np.empty(rows, np.int64)
+    _diff_rows(a, b, thresh, sums, peaks, counts)
+    return sums.sum() / a.size, peaks.max(), counts.sum()
+
+
+def load_rgb(path):
+    """Decode an image file into an (H, W, 3) uint8 RGB array."""
+    if cv2 is not None:
+        bgr = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if bgr is not None:
+            return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    return np.array(Image.open(path).convert("RGB"))
+
+
+def resize_rgb(arr, size):
+    """Resize an RGB array to size=(width, height)."""
+    if cv2 is not None:
+        return cv2.resize(arr, size, interpolation=cv2.INTER_LANCZOS4)
+    return np.array(Image.fromarray(arr).resize(size, Image.Resampling.LANCZOS))
+
+
+def compare_frames(arr1, arr2, frame_num):
+    """Compare two decoded RGB frames and return pixel difference percentage."""
     try:
-        img1 = Image.open(ours_path).convert("RGB")
-        img2 = Image.open(official_path).convert("RGB")
-
         # Ensure same size
-        if img1.size != img2.size:
-            img2 = img2.resize(img1.size, Image.Resampling.LANCZOS)
-
-        arr1 = np.array(img1)
-        arr2 = np.array(img2)
+        if arr1.shape != arr2.shape:
+            arr2 = resize_rgb(arr2, (arr1.shape[1], arr1.shape[0]))
 
-        # Calculate difference
-        diff = np.abs(arr1.astype(float) - arr2.astype(float))
-        mean_diff = np.mean(diff)
-        max_diff = np.max(diff)
+        # Calculate difference in a single pass over the uint8 data
+        mean_diff, max_diff, diff_count = diff_stats(arr1, arr2, 10)
 
         # Count pixels with significant difference (>10/255)
-        significant_diff = np.sum(diff > 10) / diff.size * 100
+        significant_diff = diff_count / arr1.size * 100
 
         print(f"Frame {frame_num}:")
         print(
@@ -48,39 +107,35 @@ def compare_frames(ours_path, official_path, frame_num):
         return None
 
 
-def check_animation_progression(frames_dir):
-    """Check if frames show animation progression."""
-    frames = sorted(Path(frames_dir).glob("frame_*.png"))
-    if len(frames) < 2:
-        print("Not enough frames to check progression")
-        return
-
-    print(f"\nAnimation progression check ({len(frames)} frames):")
-    prev_hash = None
-    identical_count = 0
+def progression_status(prev_arr, current_arr):
+    """Classify a frame against the last readable one before it."""
+    if current_arr is None:
+        return "UNREADABLE"
+    if prev_arr is None:
+        return "FIRST"
+    # Direct compare, no need to hash megabytes of bytes per frame
+    if np.array_equal(current_arr, prev_arr):
+        return "IDENTICAL"
+    return "DIFFERENT"
 
-    for i, frame_path in enumerate(frames):
-        img = Image.open(frame_path).convert("RGB")
-        current_hash = hash(np.array(img).tobytes())
 
-        if prev_hash is not None:
-            if current_hash == prev_hash:
-                identical_count += 1
-                status = "IDENTICAL"
-            else:
-                status = "DIFFERENT"
-        else:
-            status = "FIRST"
+def report_animation_progression(statuses):
+    """Print the animation progression check from per-frame statuses."""
+    if len(statuses) < 2:
+        print("Not enough frames to check progression")
+        return
 
+    print(f"\nAnimation progression check ({len(statuses)} frames):")
+    for i, status in enumerate(statuses):
         print(f"  Frame {i}: {status}")
-        prev_hash = current_hash
 
-    if identical_count == len(frames) - 1:
-        print(f"  WARNING: All frames are identical - animation is static!")
+    # Only frames compared against a readable predecessor count
+    changed = statuses.count("DIFFERENT")
+    checked = changed + statuses.count("IDENTICAL")
+    if changed == 0:
+        print(f"  WARNING: No frame changes detected - animation is static!")
     else:
-        print(
-            f"  GOOD: {len(frames) - identical_count - 1}/{len(frames) - 1} frames show changes"
-        )
+        print(f"  GOOD: {changed}/{checked} frames show changes")
 
 
 def main():
@@ -99,12 +154,54 @@ def main():
     ours_frames = sorted(Path(args.ours).glob("frame_*.png"))
     official_frames = sorted(Path(args.official).glob("frame_*.png"))
 
-    for i, (ours, official) in enumerate(zip(ours_frames, official_frames)):
-        compare_frames(ours, official, i)
+    # Each of our frames is decoded once and feeds both the comparison and
+    # the progression check; only the previous frame is kept around.
+    # PNG decoding releases the GIL, so a thread pool decodes a bounded
+    # window of upcoming pairs while the current one is compared.
+    statuses = []
+    prev_arr = None
+    workers = os.cpu_count() or 1
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+
+        def submit(i):
+            ours_future = ex.submit(load_rgb, ours_frames[i])
+            official_future = None
+            if i < len(official_frames):
+                official_future = ex.submit(load_rgb, official_frames[i])
+            return ours_future, official_future
+
+        pending = deque(submit(i) for i in range(min(workers, len(ours_frames))))
+        next_index = len(pending)
+
+        for i in range(len(ours_frames)):
+            ours_future, official_future = pending.popleft()
+            if next_index < len(ours_frames):
+                pending.append(submit(next_index))
+                next_index += 1
+
+            try:
+                ours = ours_future.result()
+            except Exception as e:
+                if official_future is not None:
+                    print(f"Error comparing frame {i}: {e}")
+                statuses.append(progression_status(prev_arr, None))
+                continue
+
+            if official_future is not None:
+                try:
+                    official = official_future.result()
+                except Exception as e:
+                    print(f"Error comparing frame {i}: {e}")
+                else:
+                    compare_frames(ours, official, i)
+
+            statuses.append(progression_status(prev_arr, ours))
+            prev_arr = ours
 
     # Check animation progression in our render
     print("\n" + "=" * 60)
-    check_animation_progression(args.ours)
+    report_animation_progression(statuses)
 
 
 if __name__ == "__main__":
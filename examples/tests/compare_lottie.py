@@ -7,72 +7,182 @@ Compares rendered Lottie video against official reference to find discrepancies
 import subprocess
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional, fall back to plain numpy
+    njit = None
+
+
+if njit is not None:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _diff_stats_kernel(a, b, thresh):
+        h, w, c = a.shape
+        row_sum = np.zeros(h, np.float64)
+        row_max = np.zeros(h, np.int64)
+        row_cnt = np.zeros(h, np.int64)
+        for y in prange(h):
+            s = 0
+            mx = 0
+            cnt = 0
+            for x in range(w):
+                for k in range(c):
+                    d = abs(np.int64(a[y, x, k]) - np.int64(b[y, x, k]))
+                    s += d
+                    if d > mx:
+                        mx = d
+                    if d > thresh:
+                        cnt += 1
+            row_sum[y] = s
+            row_max[y] = mx
+            row_cnt[y] = cnt
+        return row_sum.sum() / (h * w * c), row_max.max(), row_cnt.sum()
+
+
+def diff_stats(a, b, thresh=10):
+    """Return (mean, max, count > thresh) of the per-channel abs diff of two uint8 frames"""
+    if njit is not None:
+        return _diff_stats_kernel(a, b, thresh)
+
+    # |a - b| without leaving uint8: max(a, b) - min(a, b)
+    diff = np.maximum(a, b)
+    diff -= np.minimum(a, b)
+    return diff.mean(), diff.max(), np.count_nonzero(diff > thresh)
+
+
+def probe_video_size(video_path):
+    """Return (width, height) of the first video stream"""
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=width,height",
+        "-of",
+        "csv=p=0",
+        video_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, cmd[0])
+    width, height = result.stdout.strip().split(",")[:2]
+    return int(width), int(height)
+
+
+def extract_frames(video_path, downscale=1):
+    """Yield the frames of video as RGB arrays streamed over a pipe
+
+    Only one decoded frame is held at a time. downscale > 1 has ffmpeg
+    shrink each frame by that factor first. Raises ValueError up front if
+    the scaled frame would have no pixels.
+    """
+    width, height = probe_video_size(video_path)
+
+    # Extract at 30fps as raw rgb24, so no PNG encode/decode is involved
+    vf = "fps=30"
+    if downscale > 1:
+        if width < downscale or height < downscale:
+            raise ValueError(
+                f"--downscale {downscale} is too large for {video_path} ({width}x{height})"
+            )
+        width, height = width // downscale, height // downscale
+        vf += f",scale={width}:{height}"
 
-def extract_frames(video_path, output_dir, prefix):
-    """Extract all frames from video as PNG"""
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Extract at 30fps
     cmd = [
         "ffmpeg",
-        "-y",
+        "-loglevel",
+        "error",
         "-i",
         video_path,
         "-vf",
-        "fps=30",
-        os.path.join(output_dir, f"{prefix}_%03d.png"),
+        vf,
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-",
     ]
-    subprocess.run(cmd, capture_output=True)
-
-    # Get list of extracted frames
-    frames = sorted(
-        [
-            f
-            for f in os.listdir(output_dir)
-            if f.startswith(prefix) and f.endswith(".png")
-        ]
-    )
-    return [os.path.join(output_dir, f) for f in frames]
+    return _read_frames(cmd, width, height)
 
 
-def compare_frames(our_frame, official_frame, output_dir, frame_num):
-    """Compare two frames and generate diff images"""
+def _read_frames(cmd, width, height):
+    """Run ffmpeg and yield each rgb24 frame it writes to stdout"""
+    frame_size = width * height * 3
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1 << 20
+    )
     try:
-        import numpy as np
-        from PIL import Image
+        while True:
+            buf = proc.stdout.read(frame_size)
+            if len(buf) < frame_size:
+                break
+            yield np.frombuffer(buf, np.uint8).reshape(height, width, 3)
+
+        # A short read only means end of stream if ffmpeg exited cleanly
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd[0])
+    finally:
+        # Also reached when the caller stops early; don't wait for ffmpeg
+        # to decode the rest
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+
+
+def save_diff(diff_gray, diff_path, frame_num):
+    """Encode a grayscale diff image as a fast-compressed PNG"""
+    from PIL import Image
 
-        # Load images
-        img1 = Image.open(our_frame).convert("RGB")
-        img2 = Image.open(official_frame).convert("RGB")
+    try:
+        Image.fromarray(diff_gray).save(diff_path, optimize=False, compress_level=1)
+    except Exception as e:
+        print(f"  Error saving diff for frame {frame_num}: {e}")
 
+
+def compare_frames(our_frame, official_frame, output_dir, frame_num, writer=None):
+    """Compare two RGB frames, writing a diff image if output_dir is set
+
+    With a writer executor, the PNG encode is handed off to it instead of
+    blocking the comparison.
+    """
+    try:
         # Ensure same size
-        if img1.size != img2.size:
+        if our_frame.shape != official_frame.shape:
+            our_size = (our_frame.shape[1], our_frame.shape[0])
+            official_size = (official_frame.shape[1], official_frame.shape[0])
             print(
-                f"  Frame {frame_num}: Size mismatch - Our: {img1.size}, Official: {img2.size}"
+                f"  Frame {frame_num}: Size mismatch - Our: {our_size}, Official: {official_size}"
             )
             return None
 
-        # Convert to numpy arrays
-        arr1 = np.array(img1).astype(np.float32)
-        arr2 = np.array(img2).astype(np.float32)
-
-        # Calculate absolute difference
-        diff = np.abs(arr1 - arr2)
-        diff_max = np.max(diff)
-        diff_mean = np.mean(diff)
-
-        # Create diff visualization (scaled up for visibility)
-        diff_img = (diff / 255.0 * 255).astype(np.uint8)
-        diff_pil = Image.fromarray(diff_img)
-        diff_path = os.path.join(output_dir, f"diff_{frame_num:03d}.png")
-        diff_pil.save(diff_path)
+        # Single pass over the uint8 frames, no float temporaries
+        diff_mean, diff_max, diff_count = diff_stats(our_frame, official_frame)
+
+        # Create diff visualization only when requested
+        diff_path = None
+        if output_dir is not None:
+            diff = np.maximum(our_frame, official_frame)
+            diff -= np.minimum(our_frame, official_frame)
+            diff_gray = (diff.sum(axis=2, dtype=np.uint16) // 3).astype(np.uint8)
+            diff_path = os.path.join(output_dir, f"diff_{frame_num:03d}.png")
+            if writer is not None:
+                writer.submit(save_diff, diff_gray, diff_path, frame_num)
+            else:
+                save_diff(diff_gray, diff_path, frame_num)
 
         return {
             "frame": frame_num,
             "max_diff": diff_max,
             "mean_diff": diff_mean,
+            "diff_percent": diff_count / our_frame.size * 100,
             "diff_path": diff_path,
         }
     except Exception as e:
@@ -80,17 +190,45 @@ def compare_frames(our_frame, official_frame, output_dir, frame_num):
         return None
 
 
+def positive_int(value):
+    """argparse type for integers >= 1"""
+    import argparse
+
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--save-diffs",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Write a grayscale diff PNG for every frame",
+    )
+    parser.add_argument(
+        "--downscale",
+        type=positive_int,
+        default=1,
+        help="Shrink both videos by this factor before comparing",
+    )
+    args = parser.parse_args()
+
     # Paths
     our_video = "examples/tests/lottie_heart_eyes_output.mp4"
     official_video = "examples/tests/heart_eyes_official.mp4"
     work_dir = "examples/tests/comparison"
 
     # Create directories
-    our_frames_dir = os.path.join(work_dir, "our_frames")
-    official_frames_dir = os.path.join(work_dir, "official_frames")
-    diff_dir = os.path.join(work_dir, "diffs")
-    os.makedirs(diff_dir, exist_ok=True)
+    os.makedirs(work_dir, exist_ok=True)
+    diff_dir = None
+    if args.save_diffs:
+        diff_dir = os.path.join(work_dir, "diffs")
+        os.makedirs(diff_dir, exist_ok=True)
 
     print("=" * 60)
     print("Lottie Video Comparison Tool")
@@ -104,39 +242,67 @@ def main():
         print(f"ERROR: Official video not found: {official_video}")
         return 1
 
-    # Extract frames
-    print("\n[1/4] Extracting frames from our video...")
-    our_frames = extract_frames(our_video, our_frames_dir, "our")
-    print(f"      Extracted {len(our_frames)} frames")
-
-    print("\n[2/4] Extracting frames from official video...")
-    official_frames = extract_frames(official_video, official_frames_dir, "official")
-    print(f"      Extracted {len(official_frames)} frames")
-
-    # Compare frame counts
-    if len(our_frames) != len(official_frames):
-        print(f"\nWARNING: Frame count mismatch!")
-        print(f"  Our: {len(our_frames)} frames")
-        print(f"  Official: {len(official_frames)} frames")
-        min_frames = min(len(our_frames), len(official_frames))
-        print(f"  Comparing first {min_frames} frames only")
-    else:
-        min_frames = len(our_frames)
-        print(f"\n[3/4] Comparing {min_frames} frames...")
-
     # Compare each frame
     results = []
+    compared = 0
+    our_frames = official_frames = None
+
+    # The diff kernel is already multithreaded, so frames are compared in
+    # this process. Only PNG encoding, the remaining per-frame cost when
+    # diffs are saved, goes to a thread pool; zlib releases the GIL and the
+    # threads share the diff arrays without copying.
+    writer = ThreadPoolExecutor(max_workers=os.cpu_count()) if diff_dir else None
+    try:
+        # Decode both videos in lockstep so only one frame pair is in memory
+        print("\n[1/4] Opening our video...")
+        our_frames = extract_frames(our_video, args.downscale)
+
+        print("\n[2/4] Opening official video...")
+        official_frames = extract_frames(official_video, args.downscale)
+
+        print("\n[3/4] Comparing frames...")
+        while True:
+            our_frame = next(our_frames, None)
+            official_frame = next(official_frames, None)
+            if our_frame is None or official_frame is None:
+                break
+            compared += 1
+
+            result = compare_frames(
+                our_frame, official_frame, diff_dir, compared, writer
+            )
+            if result:
+                results.append(result)
+
+                # Progress indicator every 10 frames
+                if compared % 10 == 0:
+                    print(
+                        f"      Processed {compared} frames (last max_diff: {result['max_diff']:.2f})"
+                    )
+
+        # Whatever is left over only needs counting
+        our_count = compared + (our_frame is not None) + sum(1 for _ in our_frames)
+        official_count = (
+            compared + (official_frame is not None) + sum(1 for _ in official_frames)
+        )
+    except (ValueError, subprocess.CalledProcessError, OSError) as e:
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        for frames in (our_frames, official_frames):
+            if frames is not None:
+                frames.close()
+        if writer is not None:
+            writer.shutdown(wait=True)
 
-    for i in range(min_frames):
-        result = compare_frames(our_frames[i], official_frames[i], diff_dir, i + 1)
-        if result:
-            results.append(result)
+    print(f"      Processed {compared} frames")
 
-            # Progress indicator every 10 frames
-            if (i + 1) % 10 == 0 or i == min_frames - 1:
-                print(
-                    f"      Processed {i + 1}/{min_frames} frames (last max_diff: {result['max_diff']:.2f})"
-                )
+    # Compare frame counts
+    if our_count != official_count:
+        print(f"\nWARNING: Frame count mismatch!")
+        print(f"  Our: {our_count} frames")
+        print(f"  Official: {official_count} frames")
+        print(f"  Compared first {compared} frames only")
 
     # Generate report
     print("\n[4/4] Generating report...")
@@ -146,8 +312,6 @@ def main():
         return 1
 
     # Calculate statistics
-    import numpy as np
-
     mean_diffs = [r["mean_diff"] for r in results]
     max_diffs = [r["max_diff"] for r in results]
 
@@ -176,7 +340,10 @@ def main():
         print(
             f"\n⚠️  {len(significant)} frames have significant differences (max_diff > {threshold})"
         )
-        print(f"   First bad frame: {significant[0]['diff_path']}")
+        if diff_dir:
+            print(f"   First bad frame: {significant[0]['diff_path']}")
+        else:
+            print(f"   First bad frame: {significant[0]['frame']}")
     else:
         print(f"\n✅ All frames within acceptable tolerance (max_diff <= {threshold})")
 
@@ -198,13 +365,16 @@ def main():
         f.write("-" * 60 + "\n")
         for r in results:
             f.write(
-                f"Frame {r['frame']:3d}: Max={r['max_diff']:6.2f}, Mean={r['mean_diff']:6.2f}\n"
+                f"Frame {r['frame']:3d}: Max={r['max_diff']:6.2f}, Mean={r['mean_diff']:6.2f}, >10={r['diff_percent']:5.1f}%\n"
             )
 
     print(f"\n📄 Full report saved to: {report_path}")
-    print(f"🖼️  Diff images saved to: {diff_dir}")
-    print(f"\n💡 Tip: Check the diff images in {diff_dir}")
-    print(f"   White pixels = identical, colored pixels = differences")
+    if diff_dir:
+        print(f"🖼️  Diff images saved to: {diff_dir}")
+        print(f"\n💡 Tip: Check the diff images in {diff_dir}")
+        print(f"   Black pixels = identical, brighter pixels = larger differences")
+    else:
+        print(f"\n💡 Tip: Re-run with --save-diffs to write per-frame diff images")
 
     return 0
 
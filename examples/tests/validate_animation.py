@@ -4,19 +4,38 @@ Quick validation that Lottie animation is not frozen.
 Renders the same Lottie at multiple time points and checks for differences.
 """
 
+import re
 import subprocess
 import sys
 import tempfile
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
-def render_frame_at_time(rhai_script, time_sec, output_path):
+def build_engine():
+    """Build director-engine once and return the path to the binary"""
+    cmd = [
+        "cargo",
+        "build",
+        "--release",
+        "-p",
+        "director-cli",
+        "--bin",
+        "director-engine",
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr)
+        return None
+
+    target_dir = os.environ.get("CARGO_TARGET_DIR", "target")
+    exe = "director-engine.exe" if os.name == "nt" else "director-engine"
+    return os.path.join(target_dir, "release", exe)
+
+
+def render_frame_at_time(engine, content, time_sec, output_path):
     """Render a single frame by modifying the Rhai script temporarily"""
-    # Read original script
-    with open(rhai_script, "r") as f:
-        content = f.read()
-
     # Modify scene duration to render just this frame
     modified = content.replace(
         "let scene = movie.add_scene(3.033);",
@@ -24,31 +43,59 @@ def render_frame_at_time(rhai_script, time_sec, output_path):
     )
 
     # Write temporary script
-    temp_script = tempfile.mktemp(suffix=".rhai")
-    with open(temp_script, "w") as f:
+    fd, temp_script = tempfile.mkstemp(suffix=".rhai")
+    with os.fdopen(fd, "w") as f:
         f.write(modified)
 
+    # Render to a side file and move it into place only on success, so a
+    # failed or timed-out render never leaves a truncated MP4 that looks
+    # up to date on the next run
+    root, ext = os.path.splitext(output_path)
+    partial_path = f"{root}.partial{ext}"
+
     try:
-        # Render single frame
-        cmd = [
-            "cargo",
-            "run",
-            "--release",
-            "-p",
-            "director-cli",
-            "--bin",
-            "director-engine",
-            "--",
-            temp_script,
-            output_path,
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        return result.returncode == 0
+        # Render single frame with the prebuilt binary, skipping cargo
+        cmd = [engine, temp_script, partial_path]
+        try:
+            result = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=120
+            )
+        except subprocess.TimeoutExpired:
+            return False
+        if result.returncode != 0:
+            return False
+        os.replace(partial_path, output_path)
+        return True
     finally:
         os.unlink(temp_script)
+        if os.path.exists(partial_path):
+            os.unlink(partial_path)
+
+
+def script_assets(content):
+    """Return the asset paths a Rhai script loads with add_lottie"""
+    return re.findall(r'add_lottie\(\s*"([^"]+)"', content)
+
+
+def is_up_to_date(output_path, *inputs):
+    """True if output_path exists and is at least as new as every input"""
+    if not os.path.exists(output_path):
+        return False
+    mtime = os.path.getmtime(output_path)
+    return all(os.path.exists(p) and mtime >= os.path.getmtime(p) for p in inputs)
 
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--skip-up-to-date",
+        action="store_true",
+        help="Reuse outputs newer than the script, its Lottie assets and the engine",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Lottie Animation Validation")
     print("=" * 60)
@@ -61,14 +108,42 @@ def main():
     times = [0.0, 1.0, 2.0, 2.5, 3.0]
     outputs = []
 
+    print("\nBuilding director-engine...")
+    engine = build_engine()
+    if engine is None:
+        print("  ERROR: cargo build failed")
+        return 1
+
+    with open(script, "r") as f:
+        content = f.read()
+    inputs = [script, engine, *script_assets(content)]
+
     print("\nRendering frames at different times...")
+    jobs = []
     for t in times:
         output = output_dir / f"frame_at_{t:.1f}s.mp4"
+        if args.skip_up_to_date and is_up_to_date(output, *inputs):
+            print(f"  Time {t:.1f}s → {output} (up to date)")
+            outputs.append((t, output))
+            continue
         print(f"  Time {t:.1f}s → {output}")
-        if render_frame_at_time(script, t, str(output)):
+        jobs.append((t, output))
+
+    # Each render is an independent process, so run them side by side
+    with ThreadPoolExecutor(max_workers=max(len(jobs), 1)) as ex:
+        ok = list(
+            ex.map(
+                lambda job: render_frame_at_time(engine, content, job[0], str(job[1])),
+                jobs,
+            )
+        )
+
+    for (t, output), rendered in zip(jobs, ok):
+        if rendered:
             outputs.append((t, output))
         else:
-            print(f"    ERROR: Failed to render")
+            print(f"    ERROR: Failed to render {output}")
+    outputs.sort()
 
     print(f"\n✓ Rendered {len(outputs)} frames")
     print(f"\nCheck these files manually:")